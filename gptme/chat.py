@@ -1,13 +1,16 @@
-import errno
+import codecs
 import logging
 import os
 import re
+import stat
 import sys
 import termios
-import urllib.parse
+from collections import deque
 from collections.abc import Generator
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import cast
+from typing import Literal, cast
 
 from .commands import action_descriptions, execute_cmd
 from .config import get_config
@@ -27,7 +30,7 @@ from .tools import (
     has_tool,
     set_tool_format,
 )
-from .tools.browser import read_url
+from .tools.browser import browser, read_url
 from .tools.tts import speak
 from .util import console, path_with_tilde, print_bell
 from .util.ask_execute import ask_execute
@@ -38,6 +41,27 @@ from .util.prompt import add_history, get_input
 
 logger = logging.getLogger(__name__)
 
+# patterns used by _find_potential_paths, compiled once since it runs on every user message
+_RE_BACKTICK_FIND = re.compile(r"`([^`]+)`")
+
+# kinds of potential paths/urls found in user messages, see _classify
+PathKind = Literal["text", "binary", "url", "none"]
+
+# file types that can be included in msg.files, besides text
+_BINARY_SUFFIXES = frozenset({".png", ".jpg", ".jpeg", ".gif", ".pdf"})
+
+# common text file types, included without sniffing their contents
+_TEXT_SUFFIXES = frozenset(
+    ".c .cfg .cpp .css .csv .go .h .html .ini .java .js .json .jsonl .md .py"
+    " .rs .rst .sh .sql .toml .ts .tsx .txt .xml .yaml .yml".split()
+)
+
+# synthesizes speech in the background, single worker so responses are spoken in order
+_tts_executor = ThreadPoolExecutor(max_workers=1)
+
+# user-commands as prefixes, tuple so it can be passed directly to str.startswith
+_COMMAND_PREFIXES = tuple(f"/{cmd}" for cmd in action_descriptions)
+
 
 def chat(
     prompt_msgs: list[Message],
@@ -64,6 +88,9 @@ def chat(
     # init
     init(model, interactive, tool_allowlist)
 
+    # consumed from the front as each prompt is processed
+    prompt_queue = deque(prompt_msgs)
+
     if not get_model().supports_streaming and stream:
         logger.info(
             "Disabled streaming for '%s/%s' model (not supported)",
@@ -107,8 +134,8 @@ def chat(
     # check if message is already in log, such as upon resume
     if (
         workspace_prompt
-        and workspace_prompt not in [m.content for m in manager.log]
-        and "user" not in [m.role for m in manager.log]
+        and not any(m.role == "user" for m in manager.log)
+        and all(m.content != workspace_prompt for m in manager.log)
     ):
         manager.append(Message("system", workspace_prompt, hide=True, quiet=True))
 
@@ -124,9 +151,9 @@ def chat(
     # main loop
     while True:
         # if prompt_msgs given, process each prompt fully before moving to the next
-        if prompt_msgs:
-            while prompt_msgs:
-                msg = prompt_msgs.pop(0)
+        if prompt_queue:
+            while prompt_queue:
+                msg = prompt_queue.popleft()
                 if not msg.content.startswith("/") and msg.role == "user":
                     msg = _include_paths(msg, workspace)
                 manager.append(msg)
@@ -136,17 +163,27 @@ def chat(
 
                 # Generate and execute response for this prompt
                 while True:
+                    last_content: str | None = None
                     try:
                         set_interruptible()
-                        response_msgs = list(
-                            step(
-                                manager.log,
-                                stream,
-                                confirm_func,
-                                tool_format=tool_format_with_default,
-                                workspace=workspace,
-                            )
-                        )
+                        # append messages as they are produced, so tool output is logged incrementally
+                        for response_msg in step(
+                            manager.log,
+                            stream,
+                            confirm_func,
+                            tool_format=tool_format_with_default,
+                            workspace=workspace,
+                        ):
+                            manager.append(response_msg)
+                            if response_msg.role == "assistant":
+                                last_content = response_msg.content
+                            # run any user-commands, if msg is from user
+                            if response_msg.role == "user" and execute_cmd(
+                                response_msg, manager, confirm_func
+                            ):
+                                # commands may have edited the log, look it up again
+                                last_content = None
+                                break
                     except KeyboardInterrupt:
                         console.log("Interrupted. Stopping current execution.")
                         manager.append(Message("system", INTERRUPT_CONTENT))
@@ -154,26 +191,11 @@ def chat(
                     finally:
                         clear_interruptible()
 
-                    for response_msg in response_msgs:
-                        manager.append(response_msg)
-                        # run any user-commands, if msg is from user
-                        if response_msg.role == "user" and execute_cmd(
-                            response_msg, manager, confirm_func
-                        ):
-                            break
-
                     # Check if there are any runnable tools left
-                    last_content = next(
-                        (
-                            m.content
-                            for m in reversed(manager.log)
-                            if m.role == "assistant"
-                        ),
-                        "",
-                    )
+                    if last_content is None:
+                        last_content = _last_assistant_content(manager.log)
                     has_runnable = any(
-                        tooluse.is_runnable
-                        for tooluse in ToolUse.iter_from_content(last_content)
+                        tooluse.is_runnable for tooluse in _parse_tooluses(last_content)
                     )
                     if not has_runnable:
                         break
@@ -218,10 +240,7 @@ def step(
 
     # Check if we have any recent file modifications, and if so, run lint checks
     if not any(
-        tooluse.is_runnable
-        for tooluse in ToolUse.iter_from_content(
-            next((m.content for m in reversed(log) if m.role == "assistant"), "")
-        )
+        tooluse.is_runnable for tooluse in _parse_tooluses(_last_assistant_content(log))
     ):
         # Only check for modifications if the last assistant message has no runnable tools
         if check_for_modifications(log) and (failed_check_message := check_changes()):
@@ -237,7 +256,7 @@ def step(
         or (last_msg.role in ["assistant"])
         or last_msg.content == INTERRUPT_CONTENT
         or last_msg.pinned
-        or not any(role == "user" for role in [m.role for m in log])
+        or not any(m.role == "user" for m in log)
     ):  # pragma: no cover
         inquiry = prompt_user()
         msg = Message("user", inquiry, quiet=True)
@@ -246,6 +265,7 @@ def step(
         log = log.append(msg)
 
     # generate response and run tools
+    speech: Future[None] | None = None
     try:
         set_interruptible()
 
@@ -261,18 +281,35 @@ def step(
         if os.environ.get("GPTME_COSTS") in ["1", "true"]:
             log_costs(msgs + [msg_response])
 
-        # speak if TTS tool is available
+        # speak if TTS tool is available, without blocking tool execution
         if has_tool("tts"):
-            speak(msg_response.content)
+            speech = _tts_executor.submit(speak, msg_response.content)
 
         # log response and run tools
         if msg_response:
             yield msg_response.replace(quiet=True)
             yield from execute_msg(msg_response, confirm)
+    except KeyboardInterrupt:
+        # don't speak a response that was interrupted before synthesis began
+        if speech:
+            speech.cancel()
+        raise
     finally:
         clear_interruptible()
 
 
+# The same assistant message is checked for tool uses several times per turn,
+# so we cache the parsed result.
+@lru_cache(maxsize=64)
+def _parse_tooluses(content: str) -> tuple[ToolUse, ...]:
+    return tuple(ToolUse.iter_from_content(content))
+
+
+def _last_assistant_content(log: Log) -> str:
+    """Content of the most recent assistant message, or empty string if none."""
+    return next((m.content for m in reversed(log) if m.role == "assistant"), "")
+
+
 def prompt_user(value=None) -> str:  # pragma: no cover
     print_bell()
     # Flush stdin to clear any buffered input before prompting
@@ -303,6 +340,49 @@ def prompt_input(prompt: str, value=None) -> str:  # pragma: no cover
     return get_input(prompt)
 
 
+@lru_cache(maxsize=8)
+def _list_dir(path: str, mtime_ns: int) -> frozenset[str]:
+    """List entry names in a directory, cached until the directory's mtime changes."""
+    with os.scandir(path) as it:
+        return frozenset(entry.name for entry in it)
+
+
+def _cwd_files() -> frozenset[str]:
+    """Names of entries in the current working directory."""
+    cwd = os.getcwd()
+    return _list_dir(cwd, os.stat(cwd).st_mtime_ns)
+
+
+def _non_codeblock_spans(content: str) -> list[tuple[int, int]]:
+    """
+    Find the (start, end) spans of content outside ```-delimited code blocks.
+    An unclosed code block is treated as regular text.
+    """
+    # scans with str.find, which is much faster than a non-greedy regex on long messages
+    spans = []
+    pos = 0
+    while (start := content.find("```", pos)) != -1:
+        end = content.find("```", start + 3)
+        if end == -1:
+            break
+        spans.append((pos, start))
+        pos = end + 3
+    spans.append((pos, len(content)))
+    return spans
+
+
+def _is_path_like(word: str, cwd_files: frozenset[str]) -> bool:
+    """Check if a word looks like a path, given the names of entries in the cwd."""
+    # Contains slash: absolute/home/relative paths, subdirectories, and backtick-wrapped paths
+    if "/" in word:
+        return True
+    # URLs
+    if word.startswith("http"):
+        return True
+    # Files in current directory (no slash, so the whole word is the entry name)
+    return word in cwd_files
+
+
 def _find_potential_paths(content: str) -> list[str]:
     """
     Find potential file paths and URLs in a message content.
@@ -314,47 +394,35 @@ def _find_potential_paths(content: str) -> list[str]:
     Returns:
         List of potential paths/URLs found in the message
     """
-    # Remove code blocks to avoid matching paths inside them
-    content_no_codeblocks = re.sub(r"```[\s\S]*?```", "", content)
-
     # List current directory contents for relative path matching
-    cwd_files = [f.name for f in Path.cwd().iterdir()]
-
-    paths = []
-
-    def is_path_like(word: str) -> bool:
-        """Helper to check if a word looks like a path"""
-        return (
-            # Absolute/home/relative paths
-            any(word.startswith(s) for s in ["/", "~/", "./"])
-            # URLs
-            or word.startswith("http")
-            # Contains slash (for backtick-wrapped paths)
-            or "/" in word
-            # Files in current directory or subdirectories
-            or any(word.split("/", 1)[0] == file for file in cwd_files)
-        )
-
-    # First find backtick-wrapped content
-    for match in re.finditer(r"`([^`]+)`", content_no_codeblocks):
-        word = match.group(1).strip()
-        word = word.rstrip("?").rstrip(".").rstrip(",").rstrip("!")
-        if is_path_like(word):
-            paths.append(word)
-
-    # Then find non-backtick-wrapped words
-    # Remove backtick-wrapped content first to avoid double-processing
-    content_no_backticks = re.sub(r"`[^`]+`", "", content_no_codeblocks)
-    for word in re.split(r"\s+", content_no_backticks):
-        word = word.strip()
-        word = word.rstrip("?").rstrip(".").rstrip(",").rstrip("!")
+    cwd_files = _cwd_files()
+
+    # Backtick-wrapped paths come first, then non-backtick-wrapped words.
+    # Code blocks are skipped by only scanning the spans between them,
+    # and the text between backtick-wrapped content is split into words.
+    backtick_paths = []
+    words = []
+    for start, end in _non_codeblock_spans(content):
+        pos = start
+        for match in _RE_BACKTICK_FIND.finditer(content, start, end):
+            word = match.group(1).strip().rstrip("?.,!")
+            if _is_path_like(word, cwd_files):
+                backtick_paths.append(word)
+            words.extend(content[pos : match.start()].split())
+            pos = match.end()
+        words.extend(content[pos:end].split())
+
+    paths = backtick_paths
+    for word in words:
+        word = word.rstrip("?.,!")
         if not word:
             continue
 
-        if is_path_like(word):
+        if _is_path_like(word, cwd_files):
             paths.append(word)
 
-    return paths
+    # deduplicate, keeping order, so each file is only read once
+    return list(dict.fromkeys(paths))
 
 
 def _include_paths(msg: Message, workspace: Path | None = None) -> Message:
@@ -362,6 +430,7 @@ def _include_paths(msg: Message, workspace: Path | None = None) -> Message:
     Searches the message for any valid paths and:
      - In legacy mode (default):
        - includes the contents of text files as codeblocks
+       - includes the contents of URLs as codeblocks
        - includes images as msg.files
      - In fresh context mode (GPTME_FRESH_CONTEXT=1):
        - breaks the append-only nature of the log, but ensures we include fresh file contents
@@ -375,101 +444,149 @@ def _include_paths(msg: Message, workspace: Path | None = None) -> Message:
     # TODO: add support for directories?
     assert msg.role == "user"
 
-    append_msg = ""
-    files = []
+    fresh_context = use_fresh_context()
+    cwd_files = _cwd_files()
 
-    # Find potential paths in message
+    # classify each potential path/url once, in the order they appear
+    inline: list[tuple[PathKind, str]] = []
+    files = []
     for word in _find_potential_paths(msg.content):
         logger.debug(f"potential path/url: {word=}")
-        # If not using fresh context, include text file contents in the message
-        if not use_fresh_context() and (contents := _parse_prompt(word)):
-            append_msg += "\n\n" + contents
-        else:
-            # if we found an non-text file, include it in msg.files
-            file = _parse_prompt_files(word)
-            if file:
+        classified = [(word, *_classify(word, cwd_files))]
+        if (
+            classified[0][1] == "none"
+            # commands might take paths as arguments, so skip them entirely
+            and not word.startswith(_COMMAND_PREFIXES)
+            and len(parts := word.split()) > 1
+        ):
+            # backtick-wrapped content may hold several paths/urls, such as a command
+            classified = [(part, *_classify(part, cwd_files)) for part in parts]
+
+        for candidate, kind, path in classified:
+            # If not using fresh context, include text file and URL contents in the message
+            if not fresh_context and kind in ("text", "url"):
+                inline.append((kind, candidate))
+            elif path:
+                # if we found an non-text file, include it in msg.files
                 # Store path relative to workspace if provided
-                file = file.expanduser()
-                if workspace and not file.is_absolute():
-                    file = file.absolute().relative_to(workspace)
-                files.append(file)
+                if workspace and not path.is_absolute():
+                    path = path.absolute().relative_to(workspace)
+                files.append(path)
+
+    # read files and urls concurrently, then append them in order
+    text_paths = [word for kind, word in inline if kind == "text"]
+    urls = [word for kind, word in inline if kind == "url"]
+    contents = _read_files_bulk(text_paths) if text_paths else {}
+    if urls:
+        contents |= _read_urls(urls)
+
+    append_parts = [
+        f"\n\n```{word}\n{content}\n```"
+        for _, word in inline
+        if (content := contents.get(word)) is not None
+    ]
 
     if files:
         msg = msg.replace(files=msg.files + files)
 
     # append the message with the file contents
-    if append_msg:
-        msg = msg.replace(content=msg.content + append_msg)
+    if append_parts:
+        msg = msg.replace(content=msg.content + "".join(append_parts))
 
     return msg
 
 
-def _parse_prompt(prompt: str) -> str | None:
+def _classify(word: str, cwd_files: frozenset[str]) -> tuple[PathKind, Path | None]:
     """
-    Takes a string that might be a path or URL,
-    and if so, returns the contents of that file wrapped in a codeblock.
+    Takes a string that might be a path or URL, and classifies it as:
+     - "text": a text file
+     - "binary": a supported non-text file (image, PDF)
+     - "url": a web URL
+     - "none": anything else, including unsupported binary files
+
+    Files are checked with a single stat, and only sniffed if the suffix is unknown.
     """
-    # if prompt is a command, exit early (as commands might take paths as arguments)
-    if any(
-        prompt.startswith(command)
-        for command in [f"/{cmd}" for cmd in action_descriptions.keys()]
-    ):
-        return None
+    # if word is a command, exit early (as commands might take paths as arguments)
+    if word.startswith(_COMMAND_PREFIXES):
+        return "none", None
+
+    # cheap prefix check, rather than parsing every word as a URL
+    if word.startswith(("http://", "https://")):
+        return "url", None
 
+    # relative paths without a slash can only be files in the cwd
+    if "/" not in word and word not in cwd_files:
+        return "none", None
+
+    path = Path(word).expanduser()
     try:
-        # check if prompt is a path, if so, replace it with the contents of that file
-        f = Path(prompt).expanduser()
-        if f.exists() and f.is_file():
-            return f"```{prompt}\n{f.read_text()}\n```"
-    except OSError as oserr:
-        # some prompts are too long to be a path, so we can't read them
-        if oserr.errno != errno.ENAMETOOLONG:
-            pass
-        raise
-    except UnicodeDecodeError:
-        # some files are not text files (images, audio, PDFs, binaries, etc), so we can't read them
-        # TODO: but can we handle them better than just printing the path? maybe with metadata from `file`?
-        # logger.warning(f"Failed to read file {prompt}: not a text file")
-        return None
-
-    # check if any word in prompt is a path or URL,
-    # if so, append the contents as a code block
-    words = prompt.split()
-    paths = []
-    urls = []
-    for word in words:
-        f = Path(word).expanduser()
-        if f.exists() and f.is_file():
-            paths.append(word)
-            continue
+        if not stat.S_ISREG(os.stat(path).st_mode):
+            return "none", None
+    except (OSError, ValueError):
+        # doesn't exist, no permission, or too long to be a path
+        return "none", None
+
+    suffix = path.suffix.lower()
+    if suffix in _BINARY_SUFFIXES:
+        return "binary", path
+    if suffix in _TEXT_SUFFIXES or _is_text_file(path):
+        return "text", path
+    return "none", None
+
+
+def _is_text_file(path: Path) -> bool:
+    """Decode the start of the file as text, rather than reading it all."""
+    try:
+        with path.open("rb") as f:
+            head = f.read(8192)
+        # incremental decoder tolerates a multi-byte char cut off at the end
+        codecs.getincrementaldecoder("utf-8")().decode(head)
+        return True
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def _read_files_bulk(paths: list[str]) -> dict[str, str | None]:
+    """
+    Reads several text files concurrently, in the order given.
+    Maps each path to its contents, or None if it is not a text file.
+    """
+
+    def read(path: str) -> str | None:
         try:
-            p = urllib.parse.urlparse(word)
-            if p.scheme and p.netloc:
-                urls.append(word)
-        except ValueError:
-            pass
-
-    result = ""
-    if paths or urls:
-        result += "\n\n"
-        if paths:
-            logger.debug(f"{paths=}")
-        if urls:
-            logger.debug(f"{urls=}")
-    for path in paths:
-        result += _parse_prompt(path) or ""
+            return Path(path).expanduser().read_text()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    with ThreadPoolExecutor(
+        max_workers=min(len(paths), os.cpu_count() or 1)
+    ) as executor:
+        return dict(zip(paths, executor.map(read, paths)))
 
+
+def _read_urls(urls: list[str]) -> dict[str, str | None]:
+    """
+    Reads several URLs, concurrently if the browser backend supports it, in the order given.
+    Maps each URL to its contents, or None if it could not be read.
+    """
     if not has_tool("browser"):
         logger.warning("Browser tool not available, skipping URL read")
-    else:
-        for url in urls:
-            try:
-                content = read_url(url)
-                result += f"```{url}\n{content}\n```"
-            except Exception as e:
-                logger.warning(f"Failed to read URL {url}: {e}")
-
-    return result
+        return {}
+
+    # lynx runs a subprocess per URL, so fetch concurrently to overlap network latency.
+    # playwright runs commands one at a time on its browser thread, with a timeout
+    # counted from when each is queued, so fetch those one by one.
+    max_workers = min(8, len(urls)) if browser == "lynx" else 1
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(read_url, url) for url in urls]
+    contents: dict[str, str | None] = {}
+    for url, future in zip(urls, futures):
+        try:
+            contents[url] = future.result()
+        except Exception as e:
+            logger.warning(f"Failed to read URL {url}: {e}")
+            contents[url] = None
+    return contents
 
 
 def check_for_modifications(log: Log) -> bool:
@@ -484,7 +601,7 @@ def check_for_modifications(log: Log) -> bool:
     has_modifications = any(
         tu.tool in ["save", "patch", "append"]
         for m in messages_since_user[:3]
-        for tu in ToolUse.iter_from_content(m.content)
+        for tu in _parse_tooluses(m.content)
     )
     logger.debug(
         f"Found {len(messages_since_user)} messages since user ({has_modifications=})"
@@ -495,37 +612,3 @@ def check_for_modifications(log: Log) -> bool:
 def check_changes() -> str | None:
     """Run lint/pre-commit checks after file modifications."""
     return run_precommit_checks()
-
-
-def _parse_prompt_files(prompt: str) -> Path | None:
-    """
-    Takes a string that might be a supported file path (image, text, PDF) and returns the path.
-    Files added here will either be included inline (legacy mode) or in fresh context (fresh context mode).
-    """
-
-    # if prompt is a command, exit early (as commands might take paths as arguments)
-    if any(
-        prompt.startswith(command)
-        for command in [f"/{cmd}" for cmd in action_descriptions.keys()]
-    ):
-        return None
-
-    try:
-        p = Path(prompt).expanduser()
-        if not (p.exists() and p.is_file()):
-            return None
-
-        # Try to read as text
-        try:
-            p.read_text()
-            return p
-        except UnicodeDecodeError:
-            # If not text, check if supported binary format
-            if p.suffix[1:].lower() in ["png", "jpg", "jpeg", "gif", "pdf"]:
-                return p
-            return None
-    except OSError as oserr:  # pragma: no cover
-        # some prompts are too long to be a path, so we can't read them
-        if oserr.errno != errno.ENAMETOOLONG:
-            return None
-        raise
@@ -1,7 +1,7 @@
 import os
 from pathlib import Path
 
-from platformdirs import user_config_dir, user_data_dir
+from platformdirs import user_cache_dir, user_config_dir, user_data_dir
 
 
 def get_config_dir() -> Path:
@@ -30,6 +30,10 @@ def get_data_dir() -> Path:
     return Path(user_data_dir("gptme"))
 
 
+def get_cache_dir() -> Path:
+    return Path(user_cache_dir("gptme"))
+
+
 def get_logs_dir() -> Path:
     """Get the path for **conversation logs** (not to be confused with the logger file)"""
     if "GPTME_LOGS_HOME" in os.environ:
@@ -265,7 +265,8 @@ def print_msg(
         except Exception:
             # rich can throw errors, if so then print the raw message
             logger.exception("Error printing message")
-            print(s)
+            # flush so output appears per message, even when stdout is not a tty
+            print(s, flush=True)
     if skipped_hidden:
         console.print(
             f"[grey30]Skipped {skipped_hidden} hidden system messages, show with --show-hidden[/]"
@@ -1,8 +1,10 @@
 import json
 import logging
 import os
+import shlex
 import shutil
 import subprocess
+import tempfile
 import time
 from collections import Counter
 from copy import copy
@@ -11,6 +13,7 @@ from datetime import datetime
 from pathlib import Path
 
 from ..config import get_config
+from ..dirs import get_cache_dir
 from ..message import Message
 
 logger = logging.getLogger(__name__)
@@ -259,28 +262,131 @@ def get_changed_files() -> list[Path]:
         return []
 
 
+# above this many changed files, check all files rather than passing each one
+PRECOMMIT_MAX_FILES = 1000
+
+
+def _precommit_state_file() -> Path:
+    return get_cache_dir() / "precommit-state.json"
+
+
+def _read_precommit_state() -> dict:
+    """Read the state file, ignoring it if missing or malformed."""
+    try:
+        state = json.loads(_precommit_state_file().read_text())
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
+
+
+def _load_precommit_state(root: Path) -> dict[str, list[int]]:
+    """Load the (mtime_ns, size) of files as of the last successful checks in root."""
+    files = _read_precommit_state().get(str(root), {})
+    return files if isinstance(files, dict) else {}
+
+
+def _save_precommit_state(root: Path, files: dict[str, list[int]]) -> None:
+    """Save file stats after successful checks, replacing the state file atomically."""
+    path = _precommit_state_file()
+    state = _read_precommit_state()
+    state[str(root)] = files
+    tmp = None
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(tmp, path)
+    except OSError as e:
+        # not saving only means the next run checks more files
+        logger.warning(f"Failed to save pre-commit state to {path}: {e}")
+        if tmp:
+            Path(tmp).unlink(missing_ok=True)
+
+
+def _workspace_file_stats(root: Path) -> dict[str, list[int]] | None:
+    """Get (mtime_ns, size) of tracked and untracked non-ignored files, relative to root."""
+    try:
+        p = subprocess.run(
+            ["git", "ls-files", "--cached", "--others", "--exclude-standard", "-z"],
+            cwd=root,
+            capture_output=True,
+            text=True,
+            # keep filenames that aren't valid in the locale encoding, like os.listdir does
+            errors="surrogateescape",
+            check=True,
+        )
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        logger.debug("Could not list files with git, checking all files")
+        return None
+
+    stats = {}
+    for f in p.stdout.split("\0"):
+        if not f:
+            continue
+        try:
+            st = os.stat(root / f)
+        except OSError:
+            # deleted but still tracked, nothing to check
+            continue
+        stats[f] = [st.st_mtime_ns, st.st_size]
+    return stats
+
+
 def run_precommit_checks() -> str | None:
-    """Run pre-commit checks on modified files and return output if there are issues."""
+    """
+    Run pre-commit checks on modified files and return output if there are issues.
+
+    Only files changed since the last successful run are checked,
+    tracked by their mtime and size (like eslint's file-entry-cache).
+    """
     # check that env var feature flag is set
     if not use_checks():
         logger.info("Checks not enabled")
         return None
 
     # check if .pre-commit-config.yaml exists in any parent directory
-    if not any(
-        parent.joinpath(".pre-commit-config.yaml").exists()
-        for parent in [Path.cwd(), *Path.cwd().parents]
-    ):
+    root = next(
+        (
+            parent
+            for parent in [Path.cwd(), *Path.cwd().parents]
+            if parent.joinpath(".pre-commit-config.yaml").exists()
+        ),
+        None,
+    )
+    if not root:
         logger.info("No .pre-commit-config.yaml found in parent directories")
         return None
 
-    # cmd = "pre-commit run --files $(git ls-files -m)"
-    cmd = "pre-commit run --all-files"
+    # check everything if we have no previous state, the config changed,
+    # or too many files changed to pass them on the command line
+    stats = _workspace_file_stats(root)
+    cached = _load_precommit_state(root)
+    changed = [f for f, st in (stats or {}).items() if cached.get(f) != st]
+    if (
+        stats is None
+        or not cached
+        or ".pre-commit-config.yaml" in changed
+        or len(changed) > PRECOMMIT_MAX_FILES
+    ):
+        cmd = ["pre-commit", "run", "--all-files"]
+    elif not changed:
+        logger.info("No files changed since last successful pre-commit checks")
+        return None
+    else:
+        cmd = ["pre-commit", "run", "--files", *changed]
+
     start_time = time.monotonic()
-    logger.info(f"Running pre-commit checks: {cmd}")
+    logger.info(f"Running pre-commit checks: {shlex.join(cmd)}")
     try:
-        subprocess.run(cmd, shell=True, capture_output=True, text=True, check=True)
+        subprocess.run(cmd, cwd=root, capture_output=True, text=True, check=True)
+        # use stats from before the run, so files edited meanwhile are checked next time
+        if stats is not None:
+            _save_precommit_state(root, stats)
         return None  # No issues found
+    except FileNotFoundError:
+        logger.warning("pre-commit not found, skipping checks")
+        return None
     except subprocess.CalledProcessError as e:
         logger.error(f"Pre-commit checks failed: {e}")
         return (
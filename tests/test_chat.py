@@ -1,6 +1,9 @@
 import os
 from pathlib import Path
-from gptme.chat import _find_potential_paths
+
+import pytest
+from gptme.chat import _classify, _find_potential_paths, _include_paths
+from gptme.message import Message
 
 
 def test_find_potential_paths(tmp_path):
@@ -77,3 +80,55 @@ def test_find_potential_paths_punctuation():
     assert "/path/to/file" in paths
     assert "./local/path" in paths
     assert "https://example.com" in paths
+
+
+def test_find_potential_paths_duplicates():
+    # Paths mentioned several times, with and without backticks, are only returned once
+    content = "Compare `/path/to/file` with /other/file, then /path/to/file again"
+    assert _find_potential_paths(content) == ["/path/to/file", "/other/file"]
+
+
+def test_classify(tmp_path):
+    text = tmp_path / "text.dat"
+    # multi-byte chars crossing the sniffed header boundary should still count as text,
+    # offset by one byte so the 8 KB header ends in the middle of a char
+    text.write_text("a" + "é" * 5000)
+    with pytest.raises(UnicodeDecodeError):
+        text.read_bytes()[:8192].decode("utf-8")
+    image = tmp_path / "image.png"
+    image.write_bytes(b"\x89PNG\r\n\x1a\n\xff\xd8")
+    binary = tmp_path / "data.bin"
+    binary.write_bytes(b"\xff\xfe\x00\x01")
+    cwd_files: frozenset[str] = frozenset()
+
+    assert _classify(str(text), cwd_files) == ("text", text)
+    assert _classify(str(image), cwd_files) == ("binary", image)
+    assert _classify(str(binary), cwd_files) == ("none", None)
+    assert _classify(str(tmp_path / "missing.txt"), cwd_files) == ("none", None)
+    assert _classify(str(tmp_path), cwd_files) == ("none", None)
+    assert _classify("https://example.com", cwd_files) == ("url", None)
+    assert _classify("/log", cwd_files) == ("none", None)
+    assert _classify("a" * 10000, cwd_files) == ("none", None)
+
+
+def test_include_paths(tmp_path):
+    (tmp_path / "test.txt").write_text("hello")
+    (tmp_path / "image.png").write_bytes(b"\x89PNG\r\n\x1a\n")
+    (tmp_path / "notes.md").write_text("notes")
+
+    old_cwd = Path.cwd()
+    try:
+        os.chdir(tmp_path)
+        msg = Message("user", "Look at test.txt and `image.png`, then test.txt again")
+        msg = _include_paths(msg, tmp_path)
+        # paths given as arguments to user-commands are not included
+        cmd_msg = _include_paths(Message("user", "Run `/edit ./notes.md`"), tmp_path)
+    finally:
+        os.chdir(old_cwd)
+
+    # text files are included once, images are attached
+    assert msg.content.count("```test.txt\nhello\n```") == 1
+    assert msg.files == [Path("image.png")]
+
+    assert cmd_msg.content == "Run `/edit ./notes.md`"
+    assert cmd_msg.files == []
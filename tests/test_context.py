@@ -1,13 +1,20 @@
+import json
 import os
+import subprocess
 from datetime import datetime, timedelta
 from pathlib import Path
 
+import gptme.util.context
 from gptme.message import Message
 from gptme.util.context import (
+    _load_precommit_state,
+    _save_precommit_state,
+    _workspace_file_stats,
     append_file_content,
     file_to_display_path,
     gather_fresh_context,
     get_mentioned_files,
+    run_precommit_checks,
 )
 
 
@@ -87,3 +94,127 @@ def test_get_mentioned_files(tmp_path):
     files = get_mentioned_files(msgs, tmp_path)
     assert files[0] == file1
     assert files[1] == file2
+
+
+def test_precommit_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    (repo / ".gitignore").write_text("ignored.txt\n")
+    (repo / "ignored.txt").write_text("ignored")
+    (repo / "file.txt").write_text("content")
+
+    # untracked files are included, ignored files are not
+    stats = _workspace_file_stats(repo)
+    assert stats is not None
+    assert set(stats) == {".gitignore", "file.txt"}
+
+    assert _load_precommit_state(repo) == {}
+    _save_precommit_state(repo, stats)
+    assert _load_precommit_state(repo) == stats
+
+    # modified files get new stats
+    (repo / "file.txt").write_text("new content")
+    new_stats = _workspace_file_stats(repo)
+    assert new_stats is not None
+    assert new_stats["file.txt"] != stats["file.txt"]
+    assert new_stats[".gitignore"] == stats[".gitignore"]
+
+
+def test_run_precommit_checks_changed_files(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setattr(gptme.util.context, "use_checks", lambda: True)
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    (repo / ".pre-commit-config.yaml").write_text("repos: []\n")
+    (repo / "file.txt").write_text("content")
+    monkeypatch.chdir(repo)
+
+    # record pre-commit invocations, failing them if requested
+    real_run = subprocess.run
+    commands: list[list[str]] = []
+    fail = False
+
+    def fake_run(cmd, *args, **kwargs):
+        if cmd[0] != "pre-commit":
+            return real_run(cmd, *args, **kwargs)
+        commands.append(cmd)
+        if fail:
+            raise subprocess.CalledProcessError(1, cmd, output="lint error", stderr="")
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+
+    def run() -> list[str] | None:
+        commands.clear()
+        run_precommit_checks()
+        assert len(commands) <= 1
+        return commands[0] if commands else None
+
+    # no previous state, check everything
+    assert run() == ["pre-commit", "run", "--all-files"]
+
+    # nothing changed since the successful run, skip
+    assert run() is None
+
+    # only changed files are checked, and state is not saved on failure
+    (repo / "file.txt").write_text("new content")
+    fail = True
+    commands.clear()
+    assert "lint error" in (run_precommit_checks() or "")
+    assert commands == [["pre-commit", "run", "--files", "file.txt"]]
+    fail = False
+    assert run() == ["pre-commit", "run", "--files", "file.txt"]
+    assert run() is None
+
+    # config changed, check everything
+    (repo / ".pre-commit-config.yaml").write_text("repos: []\n\n")
+    assert run() == ["pre-commit", "run", "--all-files"]
+
+    # too many changed files, check everything
+    monkeypatch.setattr(gptme.util.context, "PRECOMMIT_MAX_FILES", 0)
+    (repo / "file.txt").write_text("newer content")
+    assert run() == ["pre-commit", "run", "--all-files"]
+
+
+def test_run_precommit_checks_unsaved_state(tmp_path, monkeypatch):
+    # cache dir can't be created, since a file is in the way
+    cache = tmp_path / "cache"
+    cache.mkdir()
+    (cache / "gptme").write_text("not a directory")
+    monkeypatch.setenv("XDG_CACHE_HOME", str(cache))
+    monkeypatch.setattr(gptme.util.context, "use_checks", lambda: True)
+    repo = tmp_path / "repo"
+    repo.mkdir()
+    subprocess.run(["git", "init", "-q"], cwd=repo, check=True)
+    (repo / ".pre-commit-config.yaml").write_text("repos: []\n")
+    monkeypatch.chdir(repo)
+
+    real_run = subprocess.run
+
+    def fake_run(cmd, *args, **kwargs):
+        if cmd[0] != "pre-commit":
+            return real_run(cmd, *args, **kwargs)
+        return subprocess.CompletedProcess(cmd, 0, "", "")
+
+    monkeypatch.setattr(subprocess, "run", fake_run)
+
+    # passing checks are still reported as passing
+    assert run_precommit_checks() is None
+
+
+def test_precommit_state_malformed(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    state_file = tmp_path / "cache" / "gptme" / "precommit-state.json"
+    state_file.parent.mkdir(parents=True)
+    repo = tmp_path / "repo"
+    stats = {"file.txt": [1, 2]}
+
+    # valid JSON, but not the expected structure
+    for state in [[], {str(repo): []}]:
+        state_file.write_text(json.dumps(state))
+        assert _load_precommit_state(repo) == {}
+        _save_precommit_state(repo, stats)
+        assert _load_precommit_state(repo) == stats